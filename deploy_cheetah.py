@@ -1,25 +1,51 @@
 #!/usr/bin/env python3
 """
-Script to deploy cheetah scripts to a remote machine via SCP.
+Script to deploy cheetah scripts to a remote machine via SFTP (or rsync / tar over ssh).
 
 Usage:
-    python deploy_cheetah.py <hostname>
+    python deploy_cheetah.py <hostname> [<hostname> ...]
     
 Example:
     python deploy_cheetah.py my-server.example.com
+    python deploy_cheetah.py server-a server-b
 """
 
 import argparse
+import os
+import posixpath
+import shutil
 import subprocess
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+try:
+    import paramiko
+except ImportError:
+    paramiko = None  # Fall back to rsync / tar over ssh
+
 # Script file extensions to copy
 SCRIPT_EXTENSIONS = {'.py', '.sh', '.bash', '.pl', '.rb', '.js', '.ts'}
 
+# Threads used to read file headers when looking for shebangs
+SHEBANG_WORKERS = 16
+
 # Remote destination path
 REMOTE_PATH = '/home/dn/cheetah'
 
+# Max hosts deployed to in parallel
+DEFAULT_JOBS = 16
+
+# Serializes output from parallel host workers so lines don't interleave
+_PRINT_LOCK = threading.Lock()
+
+
+def locked_print(*args, **kwargs):
+    """print() guarded by a lock shared by all host workers."""
+    with _PRINT_LOCK:
+        print(*args, **kwargs)
+
 
 def get_script_root() -> Path:
     """Get the root directory of this repository."""
@@ -31,88 +57,228 @@ def get_cheetah_dir() -> Path:
     return get_script_root() / 'cheetah'
 
 
+def _walk_files(directory: Path) -> list[Path]:
+    """Recursively list regular files using os.scandir (no extra stat per entry)."""
+    files = []
+    stack = [str(directory)]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue  # Unreadable or vanished directory, skipped like Path.rglob does
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file():
+                    files.append(Path(entry.path))
+    return files
+
+
+def _has_shebang(file_path: Path) -> bool:
+    """Check whether a file starts with '#!'."""
+    try:
+        with open(file_path, 'rb') as f:
+            return f.read(2) == b'#!'
+    except (IOError, PermissionError):
+        return False
+
+
 def find_script_files(directory: Path) -> list[Path]:
     """Find all script files in the given directory."""
     if not directory.exists():
         return []
     
-    script_files = []
-    for file_path in directory.rglob('*'):
-        if file_path.is_file():
-            # Check if file has a script extension
-            if file_path.suffix.lower() in SCRIPT_EXTENSIONS:
-                script_files.append(file_path)
-            # Also check for files with shebang (executable scripts without extension)
-            elif not file_path.suffix:
-                try:
-                    with open(file_path, 'rb') as f:
-                        first_bytes = f.read(2)
-                        if first_bytes == b'#!':
-                            script_files.append(file_path)
-                except (IOError, PermissionError):
-                    pass
+    candidates = _walk_files(directory)
+    
+    # Files with a script extension need no disk read
+    script_files = [p for p in candidates if p.suffix.lower() in SCRIPT_EXTENSIONS]
+    
+    # Also check for files with shebang (executable scripts without extension);
+    # the reads are I/O bound, so run them in a thread pool
+    no_ext = [p for p in candidates if not p.suffix]
+    if no_ext:
+        with ThreadPoolExecutor(max_workers=SHEBANG_WORKERS) as executor:
+            flags = executor.map(_has_shebang, no_ext)
+            script_files.extend(p for p, is_script in zip(no_ext, flags) if is_script)
     
     return sorted(script_files)
 
 
+def _tar_over_ssh(rel_paths: list[str], hostname: str, remote_path: str, cheetah_dir: Path) -> subprocess.CompletedProcess:
+    """Stream files to the remote machine as a single tar archive over one SSH connection."""
+    tar_cmd = ['tar', '-C', str(cheetah_dir), '-cf', '-', '--'] + rel_paths
+    ssh_cmd = ['ssh', hostname, f'mkdir -p {remote_path} && tar -C {remote_path} -xf -']
+    tar_proc = subprocess.Popen(tar_cmd, stdout=subprocess.PIPE)
+    result = subprocess.run(ssh_cmd, stdin=tar_proc.stdout, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    tar_proc.stdout.close()
+    if tar_proc.wait() != 0 and result.returncode == 0:
+        result.returncode = tar_proc.returncode
+        result.stderr = "tar failed to archive local files"
+    return result
+
+
+def _ssh_connect(hostname: str) -> "paramiko.SSHClient":
+    """Open a paramiko connection, honouring ~/.ssh/config like the ssh command would."""
+    user, _, host = hostname.rpartition('@')
+    options = {'hostname': host}
+    config_path = Path.home() / '.ssh' / 'config'
+    if config_path.exists():
+        options = paramiko.SSHConfig.from_path(str(config_path)).lookup(host)
+    
+    port = int(options.get('port', 22))
+    
+    # Route through the same jump host / proxy the ssh command would use
+    proxy_command = options.get('proxycommand')
+    if not proxy_command and options.get('proxyjump', 'none').lower() != 'none':
+        proxy_command = f"ssh -W {options['hostname']}:{port} {options['proxyjump']}"
+    sock = None
+    if proxy_command and proxy_command.lower() != 'none':
+        sock = paramiko.ProxyCommand(proxy_command)
+    
+    client = paramiko.SSHClient()
+    client.load_system_host_keys()
+    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    try:
+        client.connect(
+            options['hostname'],
+            port=port,
+            username=user or options.get('user'),
+            key_filename=options.get('identityfile'),
+            sock=sock,
+            timeout=30
+        )
+    except BaseException:
+        client.close()
+        if sock is not None:
+            sock.close()
+        raise
+    return client
+
+
+def _sftp_makedirs(sftp, remote_dir: str, created: set):
+    """Create a remote directory and its parents (like mkdir -p), once per directory."""
+    if remote_dir in created or remote_dir in ('', '/'):
+        return
+    _sftp_makedirs(sftp, posixpath.dirname(remote_dir), created)
+    try:
+        sftp.mkdir(remote_dir)
+    except IOError:
+        pass  # Already exists
+    created.add(remote_dir)
+
+
+def _sftp_upload(rel_paths: list[str], hostname: str, remote_path: str, cheetah_dir: Path) -> bool | None:
+    """
+    Upload all files over a single SSH connection and SFTP session.
+    
+    Returns None when the connection or authentication fails, so the caller
+    can retry with the ssh command (which can prompt for a password).
+    """
+    try:
+        client = _ssh_connect(hostname)
+    except (paramiko.SSHException, OSError) as e:
+        locked_print(f"  {hostname}: SFTP connection failed ({e}), falling back to rsync / tar over ssh")
+        return None
+    
+    try:
+        sftp = client.open_sftp()
+        created = set()
+        for rel_path in rel_paths:
+            remote_file = posixpath.join(remote_path, Path(rel_path).as_posix())
+            _sftp_makedirs(sftp, posixpath.dirname(remote_file), created)
+            local_file = cheetah_dir / rel_path
+            sftp.put(str(local_file), remote_file)
+            # put() uses the server's default mode; keep the executable bit like scp/rsync -a
+            sftp.chmod(remote_file, local_file.stat().st_mode & 0o777)
+        sftp.close()
+    except (paramiko.SSHException, OSError) as e:
+        locked_print(f"  {hostname}: Error: {e}")
+        return False
+    finally:
+        client.close()
+    
+    locked_print(f"  {hostname}: Done")
+    return True
+
+
 def scp_files(files: list[Path], hostname: str, remote_path: str, cheetah_dir: Path) -> bool:
     """
-    Copy files to remote machine using SCP.
+    Copy files to remote machine in a single transfer.
+    
+    Uses one paramiko SFTP session when paramiko is installed and can connect,
+    otherwise one rsync invocation (or tar over ssh when rsync is not installed
+    either), so all files share one SSH connection.
     
     Returns True if all files were copied successfully, False otherwise.
     """
     if not files:
-        print("No script files found to copy.")
+        locked_print("No script files found to copy.")
         return True
     
-    # First, ensure the remote directory exists
-    print(f"Creating remote directory: {remote_path}")
-    mkdir_cmd = ['ssh', hostname, f'mkdir -p {remote_path}']
-    result = subprocess.run(mkdir_cmd, capture_output=True, text=True)
+    rel_paths = [str(f.relative_to(cheetah_dir)) for f in files]
+    for rel_path in rel_paths:
+        locked_print(f"Copying: {rel_path} -> {hostname}:{remote_path}/{rel_path}")
+    
+    if paramiko is not None:
+        uploaded = _sftp_upload(rel_paths, hostname, remote_path, cheetah_dir)
+        if uploaded is not None:
+            return uploaded
+    
+    if shutil.which('rsync'):
+        # --rsync-path creates the destination root, rsync creates the subdirectories
+        rsync_cmd = [
+            'rsync', '-az', '--relative', '--files-from=-',
+            '--rsync-path', f'mkdir -p {remote_path} && rsync',
+            f'{cheetah_dir}/./', f'{hostname}:{remote_path}/'
+        ]
+        # Only stderr is reported, so don't pipe stdout back into Python
+        result = subprocess.run(
+            rsync_cmd, input='\n'.join(rel_paths) + '\n',
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+        )
+    else:
+        locked_print(f"{hostname}: rsync not found, falling back to tar over ssh")
+        result = _tar_over_ssh(rel_paths, hostname, remote_path, cheetah_dir)
+    
     if result.returncode != 0:
-        print(f"Error creating remote directory: {result.stderr}")
+        locked_print(f"  {hostname}: Error: {result.stderr.strip()}")
         return False
     
-    success = True
-    for file_path in files:
-        # Calculate relative path to preserve directory structure
-        relative_path = file_path.relative_to(cheetah_dir)
-        remote_file_path = f"{remote_path}/{relative_path}"
-        
-        # Create remote subdirectory if needed
-        if relative_path.parent != Path('.'):
-            remote_subdir = f"{remote_path}/{relative_path.parent}"
-            mkdir_cmd = ['ssh', hostname, f'mkdir -p {remote_subdir}']
-            subprocess.run(mkdir_cmd, capture_output=True, text=True)
-        
-        # Copy the file
-        print(f"Copying: {relative_path} -> {hostname}:{remote_file_path}")
-        scp_cmd = ['scp', str(file_path), f'{hostname}:{remote_file_path}']
-        result = subprocess.run(scp_cmd, capture_output=True, text=True)
-        
-        if result.returncode != 0:
-            print(f"  Error: {result.stderr.strip()}")
-            success = False
-        else:
-            print(f"  Done")
-    
-    return success
+    locked_print(f"  {hostname}: Done")
+    return True
+
+
+def deploy_many(files: list[Path], hostnames: list[str], remote_path: str, cheetah_dir: Path,
+                jobs: int = DEFAULT_JOBS) -> bool:
+    """
+    Copy files to several remote machines in parallel, one worker thread per host.
+    
+    Returns True if every host received all files, False otherwise.
+    """
+    def deploy(hostname: str) -> bool:
+        return scp_files(files, hostname, remote_path, cheetah_dir)
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(hostnames)))) as executor:
+        return all(list(executor.map(deploy, hostnames)))
 
 
 def main():
     parser = argparse.ArgumentParser(
-        description='Deploy cheetah scripts to a remote machine via SCP.',
+        description='Deploy cheetah scripts to a remote machine via SFTP.',
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
 Examples:
     %(prog)s my-server.example.com
     %(prog)s user@192.168.1.100
     %(prog)s my-server --dry-run
+    %(prog)s server-a server-b server-c -j 3
         """
     )
     parser.add_argument(
         'hostname',
-        help='Remote machine hostname or user@hostname'
+        nargs='+',
+        help='Remote machine hostname(s) or user@hostname'
     )
     parser.add_argument(
         '--dry-run', '-n',
@@ -124,6 +290,12 @@ Examples:
         default=REMOTE_PATH,
         help=f'Remote destination path (default: {REMOTE_PATH})'
     )
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f'Max machines deployed to in parallel (default: {DEFAULT_JOBS})'
+    )
     
     args = parser.parse_args()
     
@@ -135,7 +307,8 @@ Examples:
         sys.exit(1)
     
     print(f"Source directory: {cheetah_dir}")
-    print(f"Remote destination: {args.hostname}:{args.remote_path}")
+    for hostname in args.hostname:
+        print(f"Remote destination: {hostname}:{args.remote_path}")
     print()
     
     script_files = find_script_files(cheetah_dir)
@@ -153,7 +326,7 @@ Examples:
         print("Dry run mode - no files were copied.")
         sys.exit(0)
     
-    success = scp_files(script_files, args.hostname, args.remote_path, cheetah_dir)
+    success = deploy_many(script_files, args.hostname, args.remote_path, cheetah_dir, args.jobs)
     
     if success:
         print("\nAll files copied successfully!")
@@ -9,11 +9,18 @@ Entries are organized by year/month/day folders and synced with a remote repo.
 Usage:
     python app.py
 
+    Served by waitress when it is installed; set FLASK_DEBUG=1 to use
+    Flask's debug server (debugger + reloader) instead.
+
 Configuration:
     Set DIARY_REPO_PATH environment variable to point to your diary git repo.
     Default: ~/.diary
+
+    If pygit2 is installed, commits are made in-process through libgit2
+    instead of spawning git for every write.
 """
 
+import functools
 import json
 import os
 import subprocess
@@ -24,6 +31,21 @@ from pathlib import Path
 from flask import Flask, render_template, request, jsonify
 import uuid
 
+try:
+    import pygit2
+except ImportError:
+    pygit2 = None  # Fall back to the git CLI for commits
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Fall back to the stdlib json module
+
+try:
+    from waitress import serve
+except ImportError:
+    serve = None  # Fall back to Flask's built-in server
+
 app = Flask(__name__)
 
 # Configuration
@@ -31,6 +53,36 @@ DIARY_REPO_PATH = Path(os.environ.get('DIARY_REPO_PATH', Path.home() / '.diary')
 # Remote can be overridden via env; defaults to requested GitHub repo
 DIARY_REMOTE_URL = os.environ.get('DIARY_REMOTE_URL', 'git@github.com:ymozgerashvily-dn/diary.git')
 SYNC_INTERVAL = 15  # seconds
+PULL_INTERVAL = 300  # seconds between pulls when there is nothing local to push
+PORT = 5052
+SERVER_THREADS = 8
+# Werkzeug debugger + reloader, only when asked for
+DEBUG = os.environ.get('FLASK_DEBUG', '').lower() in ('1', 'true', 'yes')
+
+# In-process libgit2 handle for the write path (opened lazily, see get_repo)
+_repo = None
+_repo_lock = threading.Lock()
+
+# Set once 'origin' is known to be configured
+_remote_ready = False
+
+# Parsed entry files kept across day-folder cache misses, keyed by (path, inode, mtime, size)
+ENTRY_FILE_CACHE_SIZE = 4096
+
+# Parsed entries per day folder: {day_dir: (folder mtime_ns, entries)}
+_entry_cache = {}
+_entry_cache_lock = threading.RLock()
+
+# Set by write endpoints to wake the background sync thread
+_sync_requested = threading.Event()
+
+# Held for the duration of a sync so two syncs never run git pull/push at once
+_sync_lock = threading.Lock()
+
+# Set when commits may be waiting to be pushed (starts set to cover a previous run)
+_unpushed = threading.Event()
+_unpushed.set()
+_last_pull = None  # time.monotonic() of the last pull
 
 # Global sync state
 sync_state = {
@@ -40,19 +92,29 @@ sync_state = {
 }
 
 
-def ensure_remote_configured():
-    """Ensure the git remote 'origin' points to the configured remote URL."""
-    if not DIARY_REMOTE_URL:
-        return
+def ensure_remote_configured() -> bool:
+    """
+    Ensure the git remote 'origin' points to the configured remote URL.
+    
+    Returns whether 'origin' exists. Once it does, the answer is remembered so
+    later syncs don't spawn git just to re-read the remote config.
+    """
+    global _remote_ready
+    if _remote_ready:
+        return True
     
     # Check current remote; add or update as needed
     success, output = run_git_command(['remote', 'get-url', 'origin'])
-    if success:
-        current_url = output.strip()
-        if current_url != DIARY_REMOTE_URL:
-            run_git_command(['remote', 'set-url', 'origin', DIARY_REMOTE_URL])
-    else:
-        run_git_command(['remote', 'add', 'origin', DIARY_REMOTE_URL])
+    if DIARY_REMOTE_URL:
+        if success:
+            current_url = output.strip()
+            if current_url != DIARY_REMOTE_URL:
+                run_git_command(['remote', 'set-url', 'origin', DIARY_REMOTE_URL])
+        else:
+            success, _ = run_git_command(['remote', 'add', 'origin', DIARY_REMOTE_URL])
+    
+    _remote_ready = success
+    return success
 
 
 def ensure_repo_exists():
@@ -97,25 +159,96 @@ def run_git_command(args: list, capture_output=True) -> tuple[bool, str]:
         return False, str(e)
 
 
-def sync_with_remote():
-    """Sync local repo with remote (pull then push)."""
-    global sync_state
+def get_repo():
+    """Return the shared pygit2 Repository for the diary, or None without pygit2."""
+    global _repo
+    if pygit2 is None:
+        return None
+    if _repo is None:
+        try:
+            _repo = pygit2.Repository(str(DIARY_REPO_PATH))
+        except pygit2.GitError:
+            return None
+    return _repo
+
+
+def commit_paths(paths: list, message: str, new: bool = False) -> tuple[bool, str]:
+    """
+    Stage the given repo-relative paths (additions or deletions) and commit them.
+    
+    Uses libgit2 in-process when pygit2 is installed, so a write costs no git
+    subprocesses; otherwise (or if libgit2 fails) falls back to the git CLI.
+    Pass new=True for files git doesn't track yet, which the CLI must add first.
+    """
+    repo = get_repo()
+    if repo is not None:
+        try:
+            with _repo_lock:
+                index = repo.index
+                index.read()  # pick up changes made by git pull/rebase
+                for path in paths:
+                    if (DIARY_REPO_PATH / path).exists():
+                        index.add(path)
+                    elif path in index:
+                        index.remove(path)
+                index.write()
+                tree = index.write_tree()
+                parents = [] if repo.head_is_unborn else [repo.head.target]
+                if parents and repo[parents[0]].tree_id == tree:
+                    return False, "nothing to commit"
+                signature = repo.default_signature
+                repo.create_commit('HEAD', signature, signature, message, tree, parents)
+            # Only once the commit exists, so a sync running now can't clear it early
+            _unpushed.set()
+            return True, message
+        except (pygit2.GitError, KeyError, OSError) as e:
+            print(f"⚠️ libgit2 commit failed ({e}), falling back to git CLI")
+    
+    if not new:
+        # --only stages and commits just these paths, all in one git process
+        success, output = run_git_command(['commit', '-o', '-m', message, '--'] + paths)
+        if success or 'did not match any file' not in output:
+            if success:
+                _unpushed.set()
+            return success, output
+    
+    # Untracked paths can't be committed with --only until they are added
+    run_git_command(['add', '--'] + paths)
+    success, output = run_git_command(['commit', '-o', '-m', message, '--'] + paths)
+    if success:
+        _unpushed.set()
+    return success, output
+
+
+def sync_with_remote(force: bool = False):
+    """
+    Sync local repo with remote (pull then push).
     
-    if sync_state['syncing']:
+    Without local commits to push, the remote is only pulled every
+    PULL_INTERVAL seconds; force=True always syncs.
+    """
+    global _last_pull
+    
+    # Non-blocking: a sync already running covers this request too
+    if not _sync_lock.acquire(blocking=False):
         return False, "Sync already in progress"
     
     sync_state['syncing'] = True
     
     try:
-        # Ensure remote is configured before attempting sync
-        ensure_remote_configured()
+        # Todo edits are only written to disk; fold them into one commit now
+        commit_pending_todos()
         
-        # Check if remote exists
-        success, output = run_git_command(['remote', '-v'])
-        if not success or 'origin' not in output:
-            sync_state['syncing'] = False
+        # Ensure remote is configured before attempting sync
+        if not ensure_remote_configured():
             return True, "No remote configured - local only mode"
         
+        # Nothing to push and pulled recently: skip the network round trips
+        if (not force and not _unpushed.is_set() and _last_pull is not None
+                and time.monotonic() - _last_pull < PULL_INTERVAL):
+            return True, "Already up to date"
+        _unpushed.clear()
+        
         # Pull changes
         success, output = run_git_command(['pull', '--rebase', 'origin', 'main'])
         if not success:
@@ -124,9 +257,12 @@ def sync_with_remote():
         
         if not success and 'Could not read from remote' not in output:
             sync_state['last_error'] = f"Pull failed: {output}"
+        _last_pull = time.monotonic()
         
         # Push changes
         success, output = run_git_command(['push', 'origin', 'HEAD'])
+        if not success:
+            _unpushed.set()  # retry on the next sync
         if not success and 'Could not read from remote' not in output:
             sync_state['last_error'] = f"Push failed: {output}"
         
@@ -135,10 +271,24 @@ def sync_with_remote():
         return True, "Sync complete"
         
     except Exception as e:
+        _unpushed.set()
         sync_state['last_error'] = str(e)
         return False, str(e)
     finally:
         sync_state['syncing'] = False
+        _sync_lock.release()
+
+
+def get_sync_state() -> dict:
+    """Snapshot of sync_state, safe to serialize while a sync updates it."""
+    return dict(sync_state)
+
+
+def atomic_write(path: Path, data: bytes):
+    """Write a file via a temp file and rename, so readers never see it half-written."""
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
 
 
 def get_day_folder_name(date: datetime) -> str:
@@ -183,13 +333,13 @@ date: {date.strftime('%Y-%m-%d %H:%M:%S')}
 {content}
 """
     
-    entry_path.write_text(entry_content)
+    atomic_write(entry_path, entry_content.encode())
+    invalidate_day_entries(folder)
     
     # Git add and commit
     relative_path = entry_path.relative_to(DIARY_REPO_PATH)
-    run_git_command(['add', str(relative_path)])
     commit_msg = f"Add entry: {date.strftime('%Y-%m-%d %H:%M')}"
-    run_git_command(['commit', '-m', commit_msg])
+    commit_paths([relative_path.as_posix()], commit_msg, new=True)
     
     return {
         'id': entry_id,
@@ -207,16 +357,97 @@ def delete_entry(year: str, month: str, day: str, entry_id: str) -> bool:
         return False
     
     entry_path.unlink()
+    invalidate_day_entries(entry_path.parent)
     
     # Git add and commit
     relative_path = entry_path.relative_to(DIARY_REPO_PATH)
-    run_git_command(['add', str(relative_path)])
     commit_msg = f"Delete entry: {year}-{month}-{day}/{entry_id}"
-    run_git_command(['commit', '-m', commit_msg])
+    commit_paths([relative_path.as_posix()], commit_msg)
     
     return True
 
 
+def parse_entry(raw: bytes) -> tuple[str | None, str]:
+    """
+    Split a raw entry file into its front-matter date and its content.
+    
+    Content without a closed front matter block is returned unchanged. In the
+    header, the last line starting with 'date:' wins.
+    """
+    if not raw.startswith(b'---'):
+        return None, raw.decode()
+    
+    # Only the small header is searched; the body is decoded once, as a slice
+    end = raw.find(b'---', 3)
+    if end == -1:
+        return None, raw.decode()
+    
+    entry_date = None
+    for line in raw[3:end].decode().strip().split('\n'):
+        if line.startswith('date:'):
+            entry_date = line.replace('date:', '').strip()
+    return entry_date, raw[end + 3:].decode().strip()
+
+
+@functools.lru_cache(maxsize=ENTRY_FILE_CACHE_SIZE)
+def read_entry_file(path: str, ino: int, mtime_ns: int, size: int) -> tuple[str | None, str]:
+    """Read and parse one entry file; the stat fields only key the cache."""
+    with open(path, 'rb') as f:
+        return parse_entry(f.read())
+
+
+def read_day_entries(day_dir: Path) -> list:
+    """Read and parse every entry file in a day folder (newest first)."""
+    month_dir = day_dir.parent
+    year_dir = month_dir.parent
+    with os.scandir(day_dir) as it:
+        files = sorted((e for e in it if e.name.endswith('.md')), key=lambda e: e.name, reverse=True)
+    
+    day_entries = []
+    for entry_file in files:
+        # A new entry in the folder only costs parsing that one file
+        st = entry_file.stat()
+        entry_date, entry_content = read_entry_file(entry_file.path, st.st_ino, st.st_mtime_ns, st.st_size)
+        
+        day_entries.append({
+            'id': entry_file.name[:-len('.md')],
+            'date': entry_date,
+            'content': entry_content,
+            'year': year_dir.name,
+            'month': month_dir.name,
+            'day': day_dir.name
+        })
+    return day_entries
+
+
+def get_day_entries(day_dir: Path) -> list:
+    """Get a day's entries, re-reading the folder only when its mtime changed."""
+    mtime = day_dir.stat().st_mtime_ns
+    with _entry_cache_lock:
+        cached = _entry_cache.get(day_dir)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    
+    day_entries = read_day_entries(day_dir)
+    with _entry_cache_lock:
+        _entry_cache[day_dir] = (mtime, day_entries)
+    return day_entries
+
+
+def invalidate_day_entries(day_dir: Path):
+    """Drop a day folder from the entry cache after writing to it."""
+    with _entry_cache_lock:
+        _entry_cache.pop(day_dir, None)
+
+
+def list_subdirs(path) -> list:
+    """List the subdirectories of path, newest (highest name) first."""
+    # DirEntry.is_dir() answers from readdir's d_type, without a stat per entry
+    with os.scandir(path) as it:
+        dirs = [e for e in it if e.is_dir(follow_symlinks=False)]
+    return sorted(dirs, key=lambda e: e.name, reverse=True)
+
+
 def get_all_entries() -> list:
     """Get all diary entries organized by date."""
     entries = []
@@ -225,45 +456,19 @@ def get_all_entries() -> list:
         return entries
     
     # Walk through year/month/day structure
-    for year_dir in sorted(DIARY_REPO_PATH.iterdir(), reverse=True):
-        if not year_dir.is_dir() or not year_dir.name.isdigit():
+    for year_dir in list_subdirs(DIARY_REPO_PATH):
+        if not year_dir.name.isdigit():
             continue
         
-        for month_dir in sorted(year_dir.iterdir(), reverse=True):
-            if not month_dir.is_dir() or not month_dir.name.isdigit():
+        for month_dir in list_subdirs(year_dir.path):
+            if not month_dir.name.isdigit():
                 continue
             
-            for day_dir in sorted(month_dir.iterdir(), reverse=True):
-                if not day_dir.is_dir() or '-' not in day_dir.name:
+            for day_dir in list_subdirs(month_dir.path):
+                if '-' not in day_dir.name:
                     continue
                 
-                day_entries = []
-                for entry_file in sorted(day_dir.glob('*.md'), reverse=True):
-                    content = entry_file.read_text()
-                    
-                    # Parse metadata
-                    entry_date = None
-                    entry_content = content
-                    
-                    if content.startswith('---'):
-                        parts = content.split('---', 2)
-                        if len(parts) >= 3:
-                            metadata = parts[1].strip()
-                            entry_content = parts[2].strip()
-                            
-                            for line in metadata.split('\n'):
-                                if line.startswith('date:'):
-                                    entry_date = line.replace('date:', '').strip()
-                    
-                    day_entries.append({
-                        'id': entry_file.stem,
-                        'date': entry_date,
-                        'content': entry_content,
-                        'year': year_dir.name,
-                        'month': month_dir.name,
-                        'day': day_dir.name
-                    })
-                
+                day_entries = get_day_entries(Path(day_dir.path))
                 if day_entries:
                     entries.append({
                         'year': year_dir.name,
@@ -279,80 +484,146 @@ def get_all_entries() -> list:
 
 TODOS_FILE = 'todos.json'
 
+# In-memory todo list: (todos.json mtime_ns it was read at, todos)
+_todos_cache = None
+_todos_lock = threading.RLock()
+# Set when todos.json may hold uncommitted changes (commits happen on sync);
+# starts set so edits left over from a previous run get committed too
+_todos_dirty = True
+
 
 def _todos_path() -> Path:
     return DIARY_REPO_PATH / TODOS_FILE
 
 
+def _todos_tracked() -> bool:
+    """Whether git tracks todos.json (so a missing file is a deletion to commit)."""
+    repo = get_repo()
+    if repo is not None:
+        try:
+            with _repo_lock:
+                index = repo.index
+                index.read()
+                return TODOS_FILE in index
+        except pygit2.GitError:
+            pass
+    success, _ = run_git_command(['ls-files', '--error-unmatch', '--', TODOS_FILE])
+    return success
+
+
 def load_todos() -> list:
-    """Load todos from the JSON file."""
+    """Load todos, re-reading the JSON file only when it changed on disk (e.g. after a pull)."""
+    global _todos_cache
     path = _todos_path()
-    if not path.exists():
-        return []
-    try:
-        return json.loads(path.read_text())
-    except (json.JSONDecodeError, OSError):
-        return []
+    with _todos_lock:
+        try:
+            mtime = path.stat().st_mtime_ns
+        except OSError:
+            mtime = None
+        
+        if _todos_cache is None or _todos_cache[0] != mtime:
+            todos = []
+            if mtime is not None:
+                try:
+                    todos = json.loads(path.read_bytes())
+                except (json.JSONDecodeError, OSError):
+                    pass
+            _todos_cache = (mtime, todos)
+        
+        # Callers mutate what they get back; the cached list stays untouched
+        return [dict(t) for t in _todos_cache[1]]
+
+
+def dump_todos(todos: list) -> bytes:
+    """Serialize todos as compact JSON (orjson when available)."""
+    if orjson is not None:
+        return orjson.dumps(todos, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(todos, separators=(',', ':'), ensure_ascii=False) + '\n').encode()
 
 
 def save_todos(todos: list):
-    """Save todos to the JSON file and commit."""
+    """Save todos to the JSON file; the git commit is deferred to the next sync."""
+    global _todos_cache, _todos_dirty
     path = _todos_path()
-    path.write_text(json.dumps(todos, indent=2) + '\n')
-    run_git_command(['add', TODOS_FILE])
-    run_git_command(['commit', '-m', 'Update todos'])
+    with _todos_lock:
+        atomic_write(path, dump_todos(todos))
+        _todos_cache = (path.stat().st_mtime_ns, todos)
+        _todos_dirty = True
+
+
+def commit_pending_todos():
+    """Commit todos.json if it was saved since the last commit."""
+    global _todos_dirty
+    with _todos_lock:
+        if not _todos_dirty:
+            return
+        _todos_dirty = False
+        # No todos yet and none in git: nothing to commit
+        if not _todos_path().exists() and not _todos_tracked():
+            return
+        commit_paths([TODOS_FILE], 'Update todos')
 
 
 def create_todo(text: str) -> dict:
     """Create a new todo item."""
-    todos = load_todos()
-    todo = {
-        'id': uuid.uuid4().hex[:8],
-        'text': text,
-        'done': False,
-        'created': datetime.now().isoformat(),
-    }
-    todos.append(todo)
-    save_todos(todos)
+    with _todos_lock:
+        todos = load_todos()
+        todo = {
+            'id': uuid.uuid4().hex[:8],
+            'text': text,
+            'done': False,
+            'created': datetime.now().isoformat(),
+        }
+        todos.append(todo)
+        save_todos(todos)
     return todo
 
 
 def toggle_todo(todo_id: str) -> dict | None:
     """Toggle a todo's done state. Returns the updated todo or None."""
-    todos = load_todos()
-    for t in todos:
-        if t['id'] == todo_id:
-            t['done'] = not t['done']
-            save_todos(todos)
-            return t
+    with _todos_lock:
+        todos = load_todos()
+        for t in todos:
+            if t['id'] == todo_id:
+                t['done'] = not t['done']
+                save_todos(todos)
+                return t
     return None
 
 
 def update_todo_text(todo_id: str, text: str) -> dict | None:
     """Update a todo's text. Returns the updated todo or None."""
-    todos = load_todos()
-    for t in todos:
-        if t['id'] == todo_id:
-            t['text'] = text
-            save_todos(todos)
-            return t
+    with _todos_lock:
+        todos = load_todos()
+        for t in todos:
+            if t['id'] == todo_id:
+                t['text'] = text
+                save_todos(todos)
+                return t
     return None
 
 
 def delete_todo(todo_id: str) -> bool:
     """Delete a todo by id."""
-    todos = load_todos()
-    new_todos = [t for t in todos if t['id'] != todo_id]
-    if len(new_todos) == len(todos):
-        return False
-    save_todos(new_todos)
+    with _todos_lock:
+        todos = load_todos()
+        new_todos = [t for t in todos if t['id'] != todo_id]
+        if len(new_todos) == len(todos):
+            return False
+        save_todos(new_todos)
     return True
 
 
+def request_sync():
+    """Ask the background sync thread to sync soon; bursts of requests coalesce into one sync."""
+    _sync_requested.set()
+
+
 def background_sync():
-    """Background thread for periodic sync."""
+    """Background thread for periodic sync, woken early by request_sync()."""
     while True:
-        time.sleep(SYNC_INTERVAL)
+        _sync_requested.wait(timeout=SYNC_INTERVAL)
+        _sync_requested.clear()
         try:
             sync_with_remote()
         except Exception as e:
@@ -372,7 +643,7 @@ def api_get_entries():
     entries = get_all_entries()
     return jsonify({
         'entries': entries,
-        'sync_state': sync_state
+        'sync_state': get_sync_state()
     })
 
 
@@ -396,7 +667,7 @@ def api_create_entry():
     entry = create_entry(content, date)
     
     # Trigger sync
-    threading.Thread(target=sync_with_remote, daemon=True).start()
+    request_sync()
     
     return jsonify({
         'success': True,
@@ -411,7 +682,7 @@ def api_delete_entry(year, month, day, entry_id):
     
     if success:
         # Trigger sync
-        threading.Thread(target=sync_with_remote, daemon=True).start()
+        request_sync()
         return jsonify({'success': True})
     else:
         return jsonify({'error': 'Entry not found'}), 404
@@ -420,18 +691,18 @@ def api_delete_entry(year, month, day, entry_id):
 @app.route('/api/sync', methods=['POST'])
 def api_sync():
     """Manually trigger sync."""
-    success, message = sync_with_remote()
+    success, message = sync_with_remote(force=True)
     return jsonify({
         'success': success,
         'message': message,
-        'sync_state': sync_state
+        'sync_state': get_sync_state()
     })
 
 
 @app.route('/api/status')
 def api_status():
     """Get sync status."""
-    return jsonify(sync_state)
+    return jsonify(get_sync_state())
 
 
 # --- Todo API routes ---
@@ -450,7 +721,7 @@ def api_create_todo():
     if not text:
         return jsonify({'error': 'Text is required'}), 400
     todo = create_todo(text)
-    threading.Thread(target=sync_with_remote, daemon=True).start()
+    request_sync()
     return jsonify({'success': True, 'todo': todo})
 
 
@@ -459,7 +730,7 @@ def api_toggle_todo(todo_id):
     """Toggle a todo's done state."""
     todo = toggle_todo(todo_id)
     if todo:
-        threading.Thread(target=sync_with_remote, daemon=True).start()
+        request_sync()
         return jsonify({'success': True, 'todo': todo})
     return jsonify({'error': 'Todo not found'}), 404
 
@@ -473,7 +744,7 @@ def api_update_todo(todo_id):
         return jsonify({'error': 'Text is required'}), 400
     todo = update_todo_text(todo_id, text)
     if todo:
-        threading.Thread(target=sync_with_remote, daemon=True).start()
+        request_sync()
         return jsonify({'success': True, 'todo': todo})
     return jsonify({'error': 'Todo not found'}), 404
 
@@ -482,7 +753,7 @@ def api_update_todo(todo_id):
 def api_delete_todo(todo_id):
     """Delete a todo."""
     if delete_todo(todo_id):
-        threading.Thread(target=sync_with_remote, daemon=True).start()
+        request_sync()
         return jsonify({'success': True})
     return jsonify({'error': 'Todo not found'}), 404
 
@@ -496,14 +767,16 @@ if __name__ == '__main__':
     # Ensure repo exists
     ensure_repo_exists()
     
-    # Start background sync thread
+    # Start background sync thread (its first pass is the initial sync)
+    request_sync()
     sync_thread = threading.Thread(target=background_sync, daemon=True)
     sync_thread.start()
     print("🔄 Background sync started")
     
-    # Initial sync
-    threading.Thread(target=sync_with_remote, daemon=True).start()
-    
     print()
-    app.run(debug=True, port=5052, host='0.0.0.0')
+    if serve is None or DEBUG:
+        app.run(debug=DEBUG, port=PORT, host='0.0.0.0', threaded=True)
+    else:
+        print(f"🌐 Serving on port {PORT} with waitress ({SERVER_THREADS} threads)")
+        serve(app, host='0.0.0.0', port=PORT, threads=SERVER_THREADS)
 
@@ -7,16 +7,30 @@ Cleans up a remote machine and its nested remote machine:
 - Removes all Docker images
 - Reports disk space before/after
 
+sudo credentials are cached once per connection (sudo -v) so later sudo
+commands skip the password pipe. For best results give the user passwordless
+sudo for the commands this script runs, e.g. in /etc/sudoers.d/cleanup:
+    dn ALL=(root) NOPASSWD: /usr/bin/git, /usr/bin/docker, /bin/bash
+
 Usage:
-    python machine_clean.py <hostname>
+    python machine_clean.py <hostname> [<hostname> ...]
 
 Example:
     python machine_clean.py dev-server-01
+    python machine_clean.py dev-server-01 dev-server-02 -j 4
 """
 
 import argparse
+import re
+import select
+import shlex
 import sys
 import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     import paramiko
@@ -31,30 +45,115 @@ SSH_USERNAME = "dn"  # Default username, can be overridden
 SSH_PORT = 2222  # Port for main machine
 SSH_PORT_NESTED = 22  # Port for nested machine (standard SSH)
 CHEETAH_PATH = "/home/dn/cheetah"
+DEFAULT_JOBS = 16  # Max hosts cleaned in parallel
+SUDO_PASSWORD_REQUIRED = "a password is required"  # sudo -n error when credentials aren't cached
+OUTPUT_LINE_CAP = 500  # Max output lines kept per command (per section for batched scripts)
+SHELL_COMMAND_TIMEOUT = 1800  # Seconds a command in the persistent shell may run before it is abandoned
+
+# Disk usage in exact bytes (POSIX format) for real partitions (virtual filesystems excluded)
+DF_COMMAND = "df -B1 -P -x tmpfs -x devtmpfs -x squashfs -x overlay 2>/dev/null || df -B1 -P"
+
+# Docker cleanup steps: (emoji, description, command)
+# rm -f kills running containers too, after which prune -a --volumes drops every
+# image (none are in use any more), volume, network and the build cache
+DOCKER_CLEANUP_STEPS = [
+    ("🗑️", "Removing all containers", "docker rm -f $(docker ps -aq) 2>/dev/null || true"),
+    ("🧽", "Pruning all images, volumes and build cache", "docker system prune -af --volumes 2>/dev/null || true"),
+]
+
+# Placeholder when df output can't be parsed
+UNKNOWN_PARTITION = {
+    'filesystem': '?', 'total': '?', 'used': '?', 'available': '?', 'percent': '?', 'mountpoint': '?',
+    'total_bytes': None, 'used_bytes': None
+}
+
+# All docker steps batched into one script so they cost a single SSH round trip
+DOCKER_CLEANUP_SCRIPT = "; ".join(cmd for _, _, cmd in DOCKER_CLEANUP_STEPS)
+
+# Ways to find $REMOTE_MACHINE, tried in order: (method name, shell command)
+REMOTE_MACHINE_METHODS = [
+    ("login shell", "bash -l -c 'echo $REMOTE_MACHINE'"),
+    ("interactive login shell", "bash -li -c 'echo $REMOTE_MACHINE' 2>/dev/null"),
+    ("source .bashrc", "bash -c 'source ~/.bashrc 2>/dev/null; echo $REMOTE_MACHINE'"),
+    ("source .profile", "bash -c 'source ~/.profile 2>/dev/null; echo $REMOTE_MACHINE'"),
+    ("grep /etc/environment", "grep -oP 'REMOTE_MACHINE=\\K.*' /etc/environment 2>/dev/null"),
+    ("source profile.d", "bash -c 'for f in /etc/profile.d/*.sh; do source $f 2>/dev/null; done; echo $REMOTE_MACHINE'"),
+    # Last resort: search for it in config files
+    ("config files", "grep -h 'REMOTE_MACHINE=' ~/.bashrc ~/.profile ~/.bash_profile /etc/environment /etc/profile 2>/dev/null | head -1"),
+]
+
+# Extracts the value from a raw config line like: export REMOTE_MACHINE="host"
+_REMOTE_MACHINE_RE = re.compile(r'REMOTE_MACHINE=(["\']?)([^"\'#\s]+)\1')
+
+# A sudo password prompt at the start of a line, e.g. "[sudo] password for dn: "
+_SUDO_PROMPT_RE = re.compile(r'^\[sudo\] password for [^:]*: ?')
+
+# Serializes output from parallel host workers so lines don't interleave
+_PRINT_LOCK = threading.Lock()
+
+
+def locked_print(*args, **kwargs):
+    """print() guarded by a lock shared by all host workers."""
+    with _PRINT_LOCK:
+        print(*args, **kwargs)
+
+
+def section_marker(name: str) -> str:
+    """Shell command that prints a sentinel line delimiting a section of batched output."""
+    # Left unquoted so the marker can be embedded in a single-quoted bash -c script
+    return f"echo ---{name}---"
+
+
+def is_section_marker(line: str) -> bool:
+    """Check whether an output line is a ---NAME--- sentinel."""
+    stripped = line.strip()
+    return len(stripped) > 6 and stripped.startswith('---') and stripped.endswith('---')
+
+
+def split_sections(output: str) -> dict:
+    """Split batched command output into sections keyed by their ---NAME--- sentinels."""
+    sections = {}
+    current = None
+    for line in output.split('\n'):
+        if is_section_marker(line):
+            current = line.strip()[3:-3]
+            sections[current] = []
+        elif current is not None:
+            sections[current].append(line)
+    return {name: '\n'.join(lines).strip() for name, lines in sections.items()}
 
 
 class MachineCleanup:
     """Handles cleanup operations on remote machines."""
     
-    def __init__(self, hostname: str, password: str, username: str = "dn", verbose: bool = False):
+    def __init__(self, hostname: str, password: str, username: str = "dn", verbose: bool = False,
+                 log_prefix: str = ""):
         self.hostname = hostname
         self.password = password
         self.username = username
         self.verbose = verbose
+        self.log_prefix = log_prefix
         self.client = None
         self.disk_before = None
         self.disk_after = None
+        self._cache = {}  # Memoized remote lookups, see get_remote_machine_var
+        self._sudo_primed = False
+        self._shell = None  # Persistent remote bash channel, see _exec_in_shell
         
+    def _print(self, text: str = ""):
+        """Print one line, tagged with the log prefix when cleaning several hosts."""
+        locked_print(f"{self.log_prefix}{text}" if text else self.log_prefix.rstrip())
+    
     def log(self, emoji: str, message: str, indent: int = 0):
         """Print a formatted log message."""
         prefix = "  " * indent
-        print(f"{prefix}{emoji} {message}")
+        self._print(f"{prefix}{emoji} {message}")
     
     def log_verbose(self, message: str, indent: int = 0):
         """Print a verbose log message (only in verbose mode)."""
         if self.verbose:
             prefix = "  " * indent
-            print(f"{prefix}🔍 [VERBOSE] {message}")
+            self._print(f"{prefix}🔍 [VERBOSE] {message}")
     
     def log_command(self, command: str, indent: int = 0):
         """Print the command being executed (only in verbose mode)."""
@@ -62,32 +161,30 @@ class MachineCleanup:
             prefix = "  " * indent
             # Mask password in command for display
             display_cmd = command.replace(self.password, '****')
-            print(f"{prefix}⚡ [CMD] {display_cmd}")
+            self._print(f"{prefix}⚡ [CMD] {display_cmd}")
     
     def log_output(self, stdout: str, stderr: str, exit_code: int, indent: int = 0):
         """Print command output details (only in verbose mode)."""
         if self.verbose:
             prefix = "  " * indent
-            print(f"{prefix}📊 [EXIT CODE] {exit_code}")
+            self._print(f"{prefix}📊 [EXIT CODE] {exit_code}")
             if stdout:
-                print(f"{prefix}📤 [STDOUT]")
-                for line in stdout.split('\n'):
-                    # Mask password in output
-                    line = line.replace(self.password, '****')
-                    print(f"{prefix}   {line}")
+                self._print(f"{prefix}📤 [STDOUT]")
+                # Mask password in output
+                for line in stdout.replace(self.password, '****').split('\n'):
+                    self._print(f"{prefix}   {line}")
             if stderr:
-                print(f"{prefix}📥 [STDERR]")
-                for line in stderr.split('\n'):
-                    line = line.replace(self.password, '****')
-                    print(f"{prefix}   {line}")
-            print(f"{prefix}{'─' * 50}")
+                self._print(f"{prefix}📥 [STDERR]")
+                for line in stderr.replace(self.password, '****').split('\n'):
+                    self._print(f"{prefix}   {line}")
+            self._print(f"{prefix}{'─' * 50}")
     
     def log_section(self, title: str):
         """Print a section header."""
-        print()
-        print("=" * 60)
-        print(f"🔷 {title}")
-        print("=" * 60)
+        self._print()
+        self._print("=" * 60)
+        self._print(f"🔷 {title}")
+        self._print("=" * 60)
     
     def connect(self) -> bool:
         """Establish SSH connection to the machine."""
@@ -108,10 +205,12 @@ class MachineCleanup:
                 password=self.password,
                 timeout=30,
                 allow_agent=False,
-                look_for_keys=False
+                look_for_keys=False,
+                compress=True  # zlib on the transport; command output is mostly text
             )
             self.log("✅", f"Connected to {self.hostname}", indent=1)
             self.log_verbose(f"Connection established successfully", indent=1)
+            self._sudo_primed = self._prime_sudo()
             return True
         except paramiko.AuthenticationException as e:
             self.log("❌", f"Authentication failed for {self.hostname}", indent=1)
@@ -128,70 +227,200 @@ class MachineCleanup:
     
     def disconnect(self):
         """Close SSH connection."""
+        if self._shell:
+            self._shell.close()
+            self._shell = None
         if self.client:
             self.client.close()
             self.log("🔌", f"Disconnected from {self.hostname}")
     
-    def run_command(self, command: str, use_sudo: bool = False, show_output: bool = True) -> tuple[int, str, str]:
-        """Run a command on the remote machine."""
-        original_command = command
-        if use_sudo:
-            command = f"echo '{self.password}' | sudo -S {command}"
+    def _prime_sudo(self) -> bool:
+        """Cache sudo credentials once so later sudo commands can skip the password pipe."""
+        self.log_verbose("Caching sudo credentials (sudo -v)...", indent=1)
+        exit_code, _, _ = self.run_command(f"echo {shlex.quote(self.password)} | sudo -S -v", show_output=False)
+        return exit_code == 0
+    
+    def _exec(self, command: str, get_pty: bool = False) -> tuple[int, list, list]:
+        """
+        Execute a command and collect its (exit code, stdout lines, stderr lines).
         
+        A PTY is only requested when asked for: it costs an extra setup on the
+        remote side and merges stderr into stdout.
+        """
         # Log the command in verbose mode
         self.log_command(command, indent=2)
         
-        stdin, stdout, stderr = self.client.exec_command(command, get_pty=True)
+        stdin, stdout, stderr = self.client.exec_command(command, get_pty=get_pty)
         
-        exit_code = stdout.channel.recv_exit_status()
-        stdout_text = stdout.read().decode('utf-8', errors='ignore').strip()
-        stderr_text = stderr.read().decode('utf-8', errors='ignore').strip()
+        # Drain output as it arrives; the exit status is collected only after that
+        stdout_lines, stderr_lines, _ = self._stream_output(stdout.channel, indent=2)
+        return stdout.channel.recv_exit_status(), stdout_lines, stderr_lines
+    
+    def _exec_in_shell(self, command: str) -> tuple[int, list, list]:
+        """
+        Execute a command in a persistent remote bash on a single channel.
+        
+        Saves the channel-open round trip of exec_command. The command's
+        output is framed by a unique end marker that carries its exit code.
+        A command that doesn't finish within SHELL_COMMAND_TIMEOUT fails, and
+        the shell is reopened on the next call.
+        """
+        if self._shell is None or self._shell.closed or self._shell.exit_status_ready():
+            self.log_verbose("Opening persistent shell channel...", indent=2)
+            self._shell = self.client.get_transport().open_session()
+            self._shell.exec_command("bash -s")
         
-        # Store raw output for verbose logging before filtering
-        raw_stdout = stdout_text
+        self.log_command(command, indent=2)
+        marker = f"__END_{uuid.uuid4().hex}__"
+        # eval turns a syntax error (e.g. an unterminated quote) into a failed
+        # command instead of leaving the shell waiting for more input; stdin is
+        # detached so the command can't swallow the rest of our input
+        self._shell.sendall(f"eval {shlex.quote(command)} </dev/null; printf '{marker}%d\\n' $?\n".encode())
+        
+        stdout_lines, stderr_lines, exit_code = self._stream_output(
+            self._shell, indent=2, end_marker=marker, timeout=SHELL_COMMAND_TIMEOUT
+        )
+        if exit_code is None:
+            if self._shell.exit_status_ready():
+                # The shell itself died; report it like a failed command
+                exit_code = self._shell.recv_exit_status()
+            else:
+                # No end marker in time: the shell's state is unknown, start a fresh one
+                self.log("⏱️", f"Command timed out after {SHELL_COMMAND_TIMEOUT}s", indent=2)
+                self._shell.close()
+                self._shell = None
+                exit_code = -1
+                stderr_lines.append(f"Timed out after {SHELL_COMMAND_TIMEOUT}s")
+        return exit_code, stdout_lines, stderr_lines
+    
+    def run_command(self, command: str, use_sudo: bool = False, show_output: bool = True) -> tuple[int, str, str]:
+        """Run a command on the remote machine."""
+        result = None
+        use_pty = False
+        if use_sudo and self._sudo_primed:
+            # Credentials are cached (or NOPASSWD is configured): plain non-interactive sudo
+            result = self._exec(f"sudo -n {command}")
+            if result[0] != 0 and any(SUDO_PASSWORD_REQUIRED in line for line in result[1] + result[2]):
+                # e.g. per-tty timestamps: this session has no cached credentials
+                self.log_verbose("sudo -n needs a password, falling back to sudo -S", indent=2)
+                self._sudo_primed = False
+                result = None
+        
+        if result is None and use_sudo:
+            # Only the password pipe gets a PTY (for hosts with requiretty)
+            use_pty = True
+            # -p '' silences the prompt, which would otherwise prefix the first output line
+            result = self._exec(f"echo {shlex.quote(self.password)} | sudo -S -p '' {command}", get_pty=True)
+        elif result is None:
+            # Non-sudo commands share one long-lived channel
+            result = self._exec_in_shell(command)
+        
+        exit_code, stdout_lines, stderr_lines = result
+        stdout_text = '\n'.join(stdout_lines).strip()
+        stderr_text = '\n'.join(stderr_lines).strip()
+        
+        # Store raw stderr for verbose logging (stdout was already streamed)
         raw_stderr = stderr_text
         
-        # Filter out sudo password prompt from output
-        if use_sudo and stdout_text:
+        # Strip any sudo password prompt the PTY mixed into stdout. The prompt has
+        # no trailing newline, so only the prefix goes: the rest of the line
+        # (e.g. a section marker) is real output
+        if use_pty and stdout_text:
             lines = stdout_text.split('\n')
-            stdout_text = '\n'.join(line for line in lines if '[sudo]' not in line and self.password not in line)
+            stdout_text = '\n'.join(_SUDO_PROMPT_RE.sub('', line) for line in lines if self.password not in line)
         
-        # Verbose mode: show full output
+        # Verbose mode: stdout was printed live, show the rest
         if self.verbose:
-            self.log_output(raw_stdout, raw_stderr, exit_code, indent=2)
+            self.log_output('', raw_stderr, exit_code, indent=2)
         elif show_output and stdout_text:
             # Normal mode: truncated output
-            for line in stdout_text.split('\n')[:20]:
+            lines = stdout_text.split('\n')
+            for line in lines[:20]:
                 self.log("📝", line, indent=2)
-            if len(stdout_text.split('\n')) > 20:
+            if len(lines) > 20:
                 self.log("📝", "... (output truncated)", indent=2)
         
         return exit_code, stdout_text, stderr_text
     
-    def get_disk_usage(self) -> list:
-        """Get disk usage information for all partitions."""
-        # Get all partitions, excluding tmpfs, devtmpfs, and other virtual filesystems
-        _, output, _ = self.run_command(
-            "df -h -x tmpfs -x devtmpfs -x squashfs -x overlay 2>/dev/null || df -h",
-            show_output=False
-        )
-        
-        partitions = []
-        lines = output.strip().split('\n')
+    def _stream_output(self, channel, indent: int = 0, end_marker: str = None,
+                       timeout: float = None) -> tuple[list, list, int]:
+        """
+        Read stdout/stderr lines from a channel as they arrive.
         
-        for line in lines[1:]:  # Skip header line
-            parts = line.split()
-            if len(parts) >= 6:
-                partitions.append({
-                    'filesystem': parts[0],
-                    'total': parts[1],
-                    'used': parts[2],
-                    'available': parts[3],
-                    'percent': parts[4],
-                    'mountpoint': parts[5]
-                })
+        In verbose mode stdout lines are printed immediately. Only the last
+        OUTPUT_LINE_CAP lines of each sentinel-delimited section (and of
+        stderr) are kept, so long docker outputs don't pile up in memory
+        while their errors and summaries, which come at the end, survive.
         
-        return partitions if partitions else [{'filesystem': '?', 'total': '?', 'used': '?', 'available': '?', 'percent': '?', 'mountpoint': '?'}]
+        Reading stops when the channel exits, or when a stdout line contains
+        end_marker followed by an exit code, which is then returned (else None).
+        With a timeout, reading also gives up after that many seconds.
+        """
+        prefix = "  " * indent
+        # (section marker line or None, tail of that section's lines)
+        stdout_sections = [(None, deque(maxlen=OUTPUT_LINE_CAP))]
+        stderr_lines = deque(maxlen=OUTPUT_LINE_CAP)
+        printed_any = False
+        marker_exit = None
+        
+        def add_stdout(line: str):
+            nonlocal printed_any, marker_exit
+            if end_marker and end_marker in line:
+                line, _, code = line.partition(end_marker)
+                marker_exit = int(code) if code.isdigit() else -1
+                if not line:
+                    return
+            if is_section_marker(line):
+                stdout_sections.append((line, deque(maxlen=OUTPUT_LINE_CAP)))
+            else:
+                stdout_sections[-1][1].append(line)
+            if self.verbose:
+                if not printed_any:
+                    self._print(f"{prefix}📤 [STDOUT]")
+                    printed_any = True
+                self._print(f"{prefix}   {line.replace(self.password, '****')}")
+        
+        def add_stderr(line: str):
+            stderr_lines.append(line)
+        
+        def feed(pending: bytes, data: bytes, add) -> bytes:
+            *complete, pending = (pending + data).split(b'\n')
+            for raw in complete:
+                add(raw.decode('utf-8', errors='ignore').rstrip('\r'))
+            return pending
+        
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        pending_out = pending_err = b''
+        while marker_exit is None:
+            if channel.recv_ready():
+                pending_out = feed(pending_out, channel.recv(65536), add_stdout)
+            elif channel.recv_stderr_ready():
+                pending_err = feed(pending_err, channel.recv_stderr(65536), add_stderr)
+            elif channel.exit_status_ready() or channel.closed:
+                break
+            elif deadline is not None and time.monotonic() >= deadline:
+                break
+            else:
+                select.select([channel], [], [], 0.1)
+        
+        # Data that arrived together with the exit status is still buffered
+        while channel.recv_ready():
+            pending_out = feed(pending_out, channel.recv(65536), add_stdout)
+        while channel.recv_stderr_ready():
+            pending_err = feed(pending_err, channel.recv_stderr(65536), add_stderr)
+        
+        # Flush any trailing line without a newline
+        if pending_out:
+            feed(pending_out, b'\n', add_stdout)
+        if pending_err:
+            feed(pending_err, b'\n', add_stderr)
+        
+        stdout_lines = []
+        for marker, lines in stdout_sections:
+            if marker is not None:
+                stdout_lines.append(marker)
+            stdout_lines.extend(lines)
+        return stdout_lines, list(stderr_lines), marker_exit
     
     def display_disk_usage(self, partitions: list, label: str, indent: int = 1):
         """Display disk usage for all partitions."""
@@ -200,146 +429,58 @@ class MachineCleanup:
             self.log("📊", f"{p['mountpoint']}: {p['used']} used / {p['total']} total ({p['percent']}) - {p['filesystem']}", indent=indent+1)
     
     def _parse_df_output(self, output: str) -> list:
-        """Parse df -h output into a list of partition dictionaries."""
-        partitions = []
-        lines = output.strip().split('\n')
-        
-        for line in lines:
-            # Skip header line
-            if line.startswith('Filesystem') or not line.strip():
-                continue
-            parts = line.split()
-            if len(parts) >= 6:
-                partitions.append({
-                    'filesystem': parts[0],
-                    'total': parts[1],
-                    'used': parts[2],
-                    'available': parts[3],
-                    'percent': parts[4],
-                    'mountpoint': parts[5]
-                })
-        
-        return partitions if partitions else [{'filesystem': '?', 'total': '?', 'used': '?', 'available': '?', 'percent': '?', 'mountpoint': '?'}]
+        """Parse df -B1 -P output into a list of partition dictionaries."""
+        # maxsplit=5 keeps mountpoints containing spaces in one piece
+        rows = [line.strip().split(None, 5) for line in output.splitlines()
+                if line.strip() and not line.startswith('Filesystem')]
+        partitions = [df_partition(row) for row in rows if len(row) == 6 and row[2].isdigit()]
+        return partitions or [dict(UNKNOWN_PARTITION)]
     
     def get_docker_space(self) -> str:
         """Get Docker disk usage."""
         _, output, _ = self.run_command("docker system df 2>/dev/null | head -5", show_output=False)
         return output if output else "Docker not available"
     
-    def git_clean(self) -> bool:
-        """Run git clean in the cheetah directory."""
-        self.log("🧹", f"Running git clean in {CHEETAH_PATH}...")
-        self.log_verbose(f"Target directory: {CHEETAH_PATH}", indent=1)
-        self.log_verbose("Command: git clean -xdf (remove untracked files, directories, and ignored files)", indent=1)
-        
-        # Check if directory exists
-        self.log_verbose("Checking if directory exists...", indent=1)
-        exit_code, _, _ = self.run_command(f"test -d {CHEETAH_PATH}", show_output=False)
-        if exit_code != 0:
-            self.log("⚠️", f"Directory {CHEETAH_PATH} does not exist, skipping git clean", indent=1)
-            return True
-        
-        self.log_verbose("Directory exists, proceeding with git clean", indent=1)
+    def get_remote_machine_var(self) -> str:
+        """Get the $REMOTE_MACHINE environment variable (probed once per instance)."""
+        if 'remote_machine' in self._cache:
+            return self._cache['remote_machine']
         
-        # Run git clean (use bash -c to handle cd with sudo)
-        exit_code, output, stderr = self.run_command(
-            f"bash -c 'cd {CHEETAH_PATH} && git clean -xdf'",
-            use_sudo=True
-        )
+        self.log_verbose("Checking $REMOTE_MACHINE...", indent=1)
         
-        if exit_code == 0:
-            self.log("✅", "Git clean completed successfully", indent=1)
-            self.log_verbose(f"Files removed: {len(output.splitlines()) if output else 0} items", indent=1)
-            return True
+        # Try every method in one remote script; the shell stops at the first
+        # non-empty value, so this costs a single round trip
+        probe = ["v=''; m=''"]
+        for method_name, cmd in REMOTE_MACHINE_METHODS:
+            probe.append(f'[ -z "$v" ] && m="{method_name}" && v=$({cmd})')
+        probe += [section_marker("METHOD"), 'echo "$m"', section_marker("VALUE"), 'echo "$v"']
+        
+        self.log_verbose(f"Trying {', '.join(name for name, _ in REMOTE_MACHINE_METHODS)}...", indent=2)
+        _, output, _ = self.run_command("bash -s <<'EOF'\n" + "\n".join(probe) + "\nEOF", show_output=False)
+        sections = split_sections(output)
+        method_name = sections.get('METHOD', '')
+        result = sections.get('VALUE', '') or None
+        
+        if result and method_name == "config files":
+            # Last resort returns the raw config line; extract the value
+            match = _REMOTE_MACHINE_RE.search(result)
+            result = match.group(2) if match else None
+        
+        if result:
+            self.log_verbose(f"Found via {method_name}: {result}", indent=2)
         else:
-            self.log("⚠️", f"Git clean had issues: {stderr}", indent=1)
-            self.log_verbose(f"Exit code: {exit_code}", indent=1)
-            return False
-    
-    def docker_cleanup(self) -> bool:
-        """Remove all Docker images and clean up Docker."""
-        self.log("🐳", "Cleaning up Docker...")
+            self.log_verbose("$REMOTE_MACHINE not found in any location", indent=2)
         
-        # Get Docker info before cleanup (verbose only)
-        if self.verbose:
-            self.log_verbose("Gathering Docker state before cleanup...", indent=1)
-            self.run_command("docker ps -a 2>/dev/null || true", show_output=False)
-            self.run_command("docker images 2>/dev/null || true", show_output=False)
-            self.run_command("docker system df 2>/dev/null || true", show_output=False)
-        
-        # Stop all running containers
-        self.log("🛑", "Stopping all containers...", indent=1)
-        self.log_verbose("Command: docker stop $(docker ps -aq)", indent=2)
-        self.run_command("docker stop $(docker ps -aq) 2>/dev/null || true", show_output=False)
-        
-        # Remove all containers
-        self.log("🗑️", "Removing all containers...", indent=1)
-        self.log_verbose("Command: docker rm -f $(docker ps -aq)", indent=2)
-        exit_code, output, _ = self.run_command("docker rm -f $(docker ps -aq) 2>/dev/null || true", show_output=False)
-        
-        # Remove all images
-        self.log("🖼️", "Removing all Docker images...", indent=1)
-        self.log_verbose("Command: docker rmi -f $(docker images -aq)", indent=2)
-        exit_code, output, _ = self.run_command("docker rmi -f $(docker images -aq) 2>/dev/null || true")
-        
-        # Docker system prune
-        self.log("🧽", "Running Docker system prune...", indent=1)
-        self.log_verbose("Command: docker system prune -af --volumes (remove all unused data)", indent=2)
-        exit_code, output, _ = self.run_command("docker system prune -af --volumes 2>/dev/null || true", show_output=False)
-        
-        # Get Docker info after cleanup (verbose only)
-        if self.verbose:
-            self.log_verbose("Docker state after cleanup:", indent=1)
-            self.run_command("docker system df 2>/dev/null || true", show_output=False)
-        
-        self.log("✅", "Docker cleanup completed", indent=1)
-        return True
+        self._cache['remote_machine'] = result
+        return result
     
-    def get_remote_machine_var(self) -> str:
-        """Get the $REMOTE_MACHINE environment variable."""
-        self.log_verbose("Checking $REMOTE_MACHINE...", indent=1)
-        
-        # Try multiple methods to find the variable
-        methods = [
-            # Method 1: Login shell
-            ("login shell", "bash -l -c 'echo $REMOTE_MACHINE'"),
-            # Method 2: Interactive login shell
-            ("interactive login shell", "bash -li -c 'echo $REMOTE_MACHINE' 2>/dev/null"),
-            # Method 3: Source .bashrc directly
-            ("source .bashrc", "bash -c 'source ~/.bashrc 2>/dev/null; echo $REMOTE_MACHINE'"),
-            # Method 4: Source .profile
-            ("source .profile", "bash -c 'source ~/.profile 2>/dev/null; echo $REMOTE_MACHINE'"),
-            # Method 5: Check /etc/environment
-            ("grep /etc/environment", "grep -oP 'REMOTE_MACHINE=\\K.*' /etc/environment 2>/dev/null"),
-            # Method 6: Check common profile.d scripts
-            ("source profile.d", "bash -c 'for f in /etc/profile.d/*.sh; do source $f 2>/dev/null; done; echo $REMOTE_MACHINE'"),
-        ]
-        
-        for method_name, cmd in methods:
-            self.log_verbose(f"Trying {method_name}...", indent=2)
-            _, output, _ = self.run_command(cmd, show_output=False)
-            result = output.strip() if output.strip() else None
-            if result:
-                self.log_verbose(f"Found via {method_name}: {result}", indent=2)
-                return result
-        
-        # Last resort: search for it in config files
-        self.log_verbose("Searching config files for REMOTE_MACHINE...", indent=2)
-        _, output, _ = self.run_command(
-            "grep -h 'REMOTE_MACHINE=' ~/.bashrc ~/.profile ~/.bash_profile /etc/environment /etc/profile 2>/dev/null | head -1",
-            show_output=False
+    def run_nested_command(self, remote_machine: str, command: str, show_output: bool = False) -> tuple[int, str, str]:
+        """Run a command on the nested machine with one sshpass ssh call from the main machine."""
+        return self.run_command(
+            f"sshpass -p {shlex.quote(self.password)} ssh -p {SSH_PORT_NESTED} -o StrictHostKeyChecking=no "
+            f"{self.username}@{remote_machine} {command}",
+            show_output=show_output
         )
-        if output and 'REMOTE_MACHINE=' in output:
-            # Extract the value
-            import re
-            match = re.search(r'REMOTE_MACHINE=(["\']?)([^"\'#\s]+)\1', output)
-            if match:
-                result = match.group(2)
-                self.log_verbose(f"Found in config file: {result}", indent=2)
-                return result
-        
-        self.log_verbose("$REMOTE_MACHINE not found in any location", indent=2)
-        return None
     
     def cleanup_nested_machine(self, remote_machine: str) -> dict:
         """SSH into nested machine and clean Docker there."""
@@ -357,49 +498,101 @@ class MachineCleanup:
         self.log_verbose(f"Using nested SSH via sshpass", indent=1)
         self.log_verbose(f"Target: {self.username}@{remote_machine}:{SSH_PORT_NESTED}", indent=1)
         
-        # Get disk usage before
-        self.log_verbose("Fetching disk usage before cleanup...", indent=1)
-        _, output, _ = self.run_command(
-            f"sshpass -p '{self.password}' ssh -p {SSH_PORT_NESTED} -o StrictHostKeyChecking=no {self.username}@{remote_machine} 'df -h -x tmpfs -x devtmpfs -x squashfs -x overlay 2>/dev/null || df -h'",
-            show_output=False
-        )
-        if output:
-            result['disk_before'] = self._parse_df_output(output)
-            self.display_disk_usage(result['disk_before'], "Disk space BEFORE cleanup")
-        
-        # Stop and remove containers
-        self.log("🐳", "Cleaning Docker on nested machine...", indent=1)
+        # Batch df-before, docker cleanup and df-after into one nested SSH session;
+        # sentinel lines let us split the combined output back into its steps
+        script = "\n".join([
+            section_marker("DF_BEFORE"),
+            DF_COMMAND,
+            section_marker("DOCKER"),
+            DOCKER_CLEANUP_SCRIPT,
+            section_marker("DF_AFTER"),
+            DF_COMMAND,
+        ])
+        for _, desc, cmd in DOCKER_CLEANUP_STEPS:
+            self.log_verbose(f"{desc}: {cmd}", indent=2)
         
-        docker_commands = [
-            ("Stopping containers", "docker stop $(docker ps -aq) 2>/dev/null || true"),
-            ("Removing containers", "docker rm -f $(docker ps -aq) 2>/dev/null || true"),
-            ("Removing images", "docker rmi -f $(docker images -aq) 2>/dev/null || true"),
-            ("System prune", "docker system prune -af --volumes 2>/dev/null || true")
-        ]
+        _, output, _ = self.run_nested_command(remote_machine, f"'bash -s' <<'EOF'\n{script}\nEOF")
+        sections = split_sections(output)
+        if not sections:
+            self.log("❌", f"Could not connect to nested machine {remote_machine}", indent=1)
+            return result
         
-        for desc, cmd in docker_commands:
-            self.log_verbose(f"{desc}: {cmd}", indent=2)
-            self.run_command(
-                f"sshpass -p '{self.password}' ssh -p {SSH_PORT_NESTED} -o StrictHostKeyChecking=no {self.username}@{remote_machine} '{cmd}'",
-                show_output=False
-            )
+        if sections.get('DF_BEFORE'):
+            result['disk_before'] = self._parse_df_output(sections['DF_BEFORE'])
+            self.display_disk_usage(result['disk_before'], "Disk space BEFORE cleanup")
         
+        self.log("🐳", "Cleaning Docker on nested machine...", indent=1)
+        if 'DOCKER' not in sections:
+            self.log("⚠️", "Docker cleanup did not run on nested machine", indent=1)
+            return result
         self.log("✅", "Docker cleanup completed on nested machine", indent=1)
         
-        # Get disk usage after
-        self.log_verbose("Fetching disk usage after cleanup...", indent=1)
-        _, output, _ = self.run_command(
-            f"sshpass -p '{self.password}' ssh -p {SSH_PORT_NESTED} -o StrictHostKeyChecking=no {self.username}@{remote_machine} 'df -h -x tmpfs -x devtmpfs -x squashfs -x overlay 2>/dev/null || df -h'",
-            show_output=False
-        )
-        if output:
-            result['disk_after'] = self._parse_df_output(output)
+        if sections.get('DF_AFTER'):
+            result['disk_after'] = self._parse_df_output(sections['DF_AFTER'])
             self.display_disk_usage(result['disk_after'], "Disk space AFTER cleanup")
         
         result['success'] = True
         self.log_verbose("Nested machine cleanup completed successfully", indent=1)
         return result
     
+    def batched_cleanup(self) -> tuple[list, list, bool]:
+        """
+        Run df, git clean, Docker cleanup and df again in a single remote exec.
+        
+        Returns the (before, after) partition lists and whether the script
+        actually ran. Each step's output is delimited by sentinel lines so it
+        can still be reported separately.
+        """
+        git_clean = (
+            f"if test -d {CHEETAH_PATH}; then (cd {CHEETAH_PATH} && git clean -xdf) 2>&1; rc=$?; "
+            f"else rc=missing; fi; {section_marker('GIT_STATUS')}; echo $rc"
+        )
+        script = "; ".join([
+            section_marker("DF_BEFORE"),
+            DF_COMMAND,
+            section_marker("GIT_CLEAN"),
+            git_clean,
+            section_marker("DOCKER"),
+            DOCKER_CLEANUP_SCRIPT,
+            section_marker("DF_AFTER"),
+            DF_COMMAND,
+        ])
+        
+        self.log_verbose("Running df, git clean and Docker cleanup as one batched script", indent=1)
+        _, output, _ = self.run_command(f"bash -c '{script}'", use_sudo=True, show_output=False)
+        sections = split_sections(output)
+        
+        disk_before = self._parse_df_output(sections.get('DF_BEFORE', ''))
+        self.display_disk_usage(disk_before, "Disk space BEFORE cleanup")
+        
+        self.log("🧹", f"Running git clean in {CHEETAH_PATH}...")
+        git_status = sections.get('GIT_STATUS', '')
+        git_output = sections.get('GIT_CLEAN', '')
+        if git_status == 'missing':
+            self.log("⚠️", f"Directory {CHEETAH_PATH} does not exist, skipping git clean", indent=1)
+        elif git_status == '0':
+            self.log("✅", "Git clean completed successfully", indent=1)
+            self.log_verbose(f"Files removed: {len(git_output.splitlines()) if git_output else 0} items", indent=1)
+        else:
+            self.log("⚠️", f"Git clean had issues: {git_output}", indent=1)
+            self.log_verbose(f"Exit code: {git_status}", indent=1)
+        
+        self.log("🐳", "Cleaning up Docker...")
+        for emoji, desc, _ in DOCKER_CLEANUP_STEPS:
+            self.log(emoji, f"{desc}...", indent=1)
+        if 'DOCKER' in sections:
+            self.log("✅", "Docker cleanup completed", indent=1)
+        else:
+            self.log("⚠️", "Docker cleanup did not run", indent=1)
+        
+        disk_after = self._parse_df_output(sections.get('DF_AFTER', ''))
+        self.display_disk_usage(disk_after, "Disk space AFTER cleanup")
+        
+        # e.g. sudo failed: nothing ran, so there is nothing to report as cleaned
+        ran = 'DOCKER' in sections and disk_before[0]['total_bytes'] is not None
+        
+        return disk_before, disk_after, ran
+    
     def run_full_cleanup(self) -> dict:
         """Run the complete cleanup process."""
         results = {
@@ -419,25 +612,15 @@ class MachineCleanup:
             return results
         
         try:
-            # Get disk usage before
-            results['main_machine']['disk_before'] = self.get_disk_usage()
-            self.display_disk_usage(results['main_machine']['disk_before'], "Disk space BEFORE cleanup")
-            
-            # Run git clean
-            self.git_clean()
-            
-            # Docker cleanup
-            self.docker_cleanup()
-            
-            # Get disk usage after
-            results['main_machine']['disk_after'] = self.get_disk_usage()
-            self.display_disk_usage(results['main_machine']['disk_after'], "Disk space AFTER cleanup")
-            
-            results['main_machine']['success'] = True
+            main = results['main_machine']
+            main['disk_before'], main['disk_after'], main['success'] = self.batched_cleanup()
             
             # Check for nested machine
             remote_machine = self.get_remote_machine_var()
-            if remote_machine:
+            if remote_machine and remote_machine.strip().lower() in {self.hostname.lower(), 'localhost', '127.0.0.1'}:
+                # Same docker daemon we just cleaned; a second pass would redo all of it
+                self.log("ℹ️", f"$REMOTE_MACHINE ({remote_machine}) points at the main host, skipping nested machine cleanup")
+            elif remote_machine:
                 self.log("🔍", f"Found $REMOTE_MACHINE: {remote_machine}")
                 results['nested_machine'] = self.cleanup_nested_machine(remote_machine)
             else:
@@ -449,16 +632,6 @@ class MachineCleanup:
         return results
 
 
-def parse_size(s: str) -> float:
-    """Parse a size string like '4.3G' into bytes."""
-    s = s.upper().strip()
-    multipliers = {'K': 1024, 'M': 1024**2, 'G': 1024**3, 'T': 1024**4}
-    for suffix, mult in multipliers.items():
-        if s.endswith(suffix):
-            return float(s[:-1]) * mult
-    return float(s)
-
-
 def format_size(bytes_val: float) -> str:
     """Format bytes as human-readable string."""
     for unit in ['B', 'K', 'M', 'G', 'T']:
@@ -468,6 +641,21 @@ def format_size(bytes_val: float) -> str:
     return f"{bytes_val:.1f}P"
 
 
+def df_partition(parts: list) -> dict:
+    """Build a partition dict from one row of `df -B1 -P` output."""
+    total_bytes, used_bytes = int(parts[1]), int(parts[2])
+    return {
+        'filesystem': parts[0],
+        'total': format_size(total_bytes),
+        'used': format_size(used_bytes),
+        'available': format_size(int(parts[3])),
+        'percent': parts[4],
+        'mountpoint': parts[5],
+        'total_bytes': total_bytes,
+        'used_bytes': used_bytes
+    }
+
+
 def print_partition_summary(before_list: list, after_list: list):
     """Print summary comparing before/after for all partitions."""
     # Create lookup by mountpoint
@@ -485,20 +673,18 @@ def print_partition_summary(before_list: list, after_list: list):
             print(f"      📤 After:     {after['used']} used / {after['total']} total ({after['percent']})")
             print(f"      💾 Available: {after['available']}")
             
-            try:
-                before_bytes = parse_size(before['used'])
-                after_bytes = parse_size(after['used'])
-                freed = before_bytes - after_bytes
-                total_freed += freed
-                
-                if freed > 0:
-                    print(f"      🎊 Freed:     {format_size(freed)}")
-                elif freed < 0:
-                    print(f"      ⚠️  Increased: {format_size(abs(freed))}")
-                else:
-                    print(f"      ➡️  No change")
-            except:
-                pass
+            if before['used_bytes'] is None or after['used_bytes'] is None:
+                continue
+            
+            freed = before['used_bytes'] - after['used_bytes']
+            total_freed += freed
+            
+            if freed > 0:
+                print(f"      🎊 Freed:     {format_size(freed)}")
+            elif freed < 0:
+                print(f"      ⚠️  Increased: {format_size(abs(freed))}")
+            else:
+                print(f"      ➡️  No change")
     
     if total_freed != 0:
         print()
@@ -508,6 +694,24 @@ def print_partition_summary(before_list: list, after_list: list):
             print(f"   ⚠️  TOTAL SPACE INCREASED: {format_size(abs(total_freed))}")
 
 
+def clean_many(hostnames: list, password: str, username: str = "dn", verbose: bool = False,
+               jobs: int = DEFAULT_JOBS) -> list:
+    """
+    Clean several machines in parallel, one worker thread per host.
+    
+    Returns the run_full_cleanup results in the same order as hostnames.
+    """
+    if len(hostnames) == 1:
+        return [MachineCleanup(hostnames[0], password, username, verbose).run_full_cleanup()]
+    
+    def clean(hostname: str) -> dict:
+        cleaner = MachineCleanup(hostname, password, username, verbose, log_prefix=f"[{hostname}] ")
+        return cleaner.run_full_cleanup()
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(hostnames)))) as executor:
+        return list(executor.map(clean, hostnames))
+
+
 def print_summary(results: dict):
     """Print a summary of the cleanup results."""
     print()
@@ -557,11 +761,13 @@ Examples:
     %(prog)s dev-server-01
     %(prog)s 192.168.1.100
     %(prog)s myhost.example.com -u admin
+    %(prog)s dev-server-01 dev-server-02 dev-server-03 -j 3
         """
     )
     parser.add_argument(
         'hostname',
-        help='Remote machine hostname or IP address'
+        nargs='+',
+        help='Remote machine hostname(s) or IP address(es)'
     )
     parser.add_argument(
         '-u', '--username',
@@ -578,6 +784,12 @@ Examples:
         action='store_true',
         help='Enable verbose mode with maximum technical details'
     )
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f'Max machines cleaned in parallel (default: {DEFAULT_JOBS})'
+    )
     
     args = parser.parse_args()
     
@@ -591,18 +803,18 @@ Examples:
         print("🔍 VERBOSE MODE ENABLED - Showing all technical details")
         print()
     
-    cleaner = MachineCleanup(
-        hostname=args.hostname,
+    all_results = clean_many(
+        hostnames=args.hostname,
         password=args.password,
         username=args.username,
-        verbose=args.verbose
+        verbose=args.verbose,
+        jobs=args.jobs
     )
-    
-    results = cleaner.run_full_cleanup()
-    print_summary(results)
+    for results in all_results:
+        print_summary(results)
     
     # Exit with appropriate code
-    if results['main_machine']['success']:
+    if all(results['main_machine']['success'] for results in all_results):
         sys.exit(0)
     else:
         sys.exit(1)
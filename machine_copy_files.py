@@ -13,9 +13,14 @@ Example:
 """
 
 import argparse
+import asyncio
 import sys
 import os
+import posixpath
+import queue
 import stat
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     import paramiko
@@ -23,6 +28,11 @@ except ImportError:
     print("❌ Error: paramiko is required. Install with: pip install paramiko")
     sys.exit(1)
 
+try:
+    import asyncssh
+except ImportError:
+    asyncssh = None  # Only needed for --async
+
 
 # Configuration
 SSH_PASSWORD = "drivenets"
@@ -31,18 +41,29 @@ SSH_PORT = 2222
 LOCAL_FOLDER = os.path.expanduser("~/yossi_moz_wbox_machine_content")
 REMOTE_FOLDER = "/home/dn/yossi_moz_content"
 
+# SFTP channels (and upload threads) opened on the one SSH connection
+SFTP_CHANNELS = 8
+
+# Per-channel flow control window; paramiko's 2 MiB default caps throughput on high-latency links
+SFTP_WINDOW_SIZE = 64 * 1024 * 1024
+SFTP_MAX_PACKET_SIZE = 32768
+
 
 class MachineCopyFiles:
     """Handles recursive SCP copy of a local folder to a remote machine."""
 
-    def __init__(self, hostname: str, password: str, username: str = "dn", verbose: bool = False):
+    def __init__(self, hostname: str, password: str, username: str = "dn", verbose: bool = False,
+                 use_async: bool = False):
         self.hostname = hostname
         self.password = password
         self.username = username
         self.verbose = verbose
+        self.use_async = use_async
         self.client = None
         self.sftp = None
+        self.extra_sftps = []
         self.files_copied = 0
+        self._count_lock = threading.Lock()
         self.dirs_created = 0
 
     def log(self, emoji: str, message: str, indent: int = 0):
@@ -81,7 +102,7 @@ class MachineCopyFiles:
                 allow_agent=False,
                 look_for_keys=False
             )
-            self.sftp = self.client.open_sftp()
+            self.sftp = self._open_sftp()
             self.log("✅", f"Connected to {self.hostname}", indent=1)
             return True
         except paramiko.AuthenticationException:
@@ -96,12 +117,23 @@ class MachineCopyFiles:
 
     def disconnect(self):
         """Close SFTP and SSH connections."""
+        for sftp in self.extra_sftps:
+            sftp.close()
+        self.extra_sftps = []
         if self.sftp:
             self.sftp.close()
         if self.client:
             self.client.close()
             self.log("🔌", f"Disconnected from {self.hostname}")
 
+    def _open_sftp(self):
+        """Open an SFTP channel with a large window for bulk transfer."""
+        return paramiko.SFTPClient.from_transport(
+            self.client.get_transport(),
+            window_size=SFTP_WINDOW_SIZE,
+            max_packet_size=SFTP_MAX_PACKET_SIZE
+        )
+
     def _remote_mkdir_p(self, remote_path: str):
         """Recursively create remote directories (like mkdir -p)."""
         dirs_to_create = []
@@ -122,24 +154,99 @@ class MachineCopyFiles:
             self.sftp.mkdir(d)
             self.dirs_created += 1
 
-    def _copy_recursive(self, local_path: str, remote_path: str):
-        """Recursively copy a local directory tree to the remote machine."""
-        self._remote_mkdir_p(remote_path)
+    def _walk_local(self, local_root: str, remote_root: str) -> list:
+        """
+        Walk the local tree once and return [(remote_dir, [(local_file, remote_file), ...])].
+
+        The same listing drives both the upfront file count and the copy, so
+        the tree is only read once.
+        """
+        plan = []
+        for root, dirs, files in os.walk(local_root, followlinks=True):
+            dirs.sort()
+            rel = os.path.relpath(root, local_root)
+            remote_dir = remote_root if rel == "." else remote_root + "/" + rel.replace(os.sep, "/")
+            pairs = [(os.path.join(root, name), remote_dir + "/" + name) for name in sorted(files)]
+            plan.append((remote_dir, pairs))
+        return plan
+
+    def _create_remote_dirs(self, remote_dirs: list):
+        """
+        Create the remote directories of a walk, parents before children.
+
+        Only the root goes through _remote_mkdir_p's stat probes (its parents
+        may be missing). Every other directory's parent is earlier in the
+        list, so it just gets one mkdir; failing means it already exists.
+        """
+        root, *subdirs = sorted(set(remote_dirs), key=lambda d: d.count("/"))
+        self._remote_mkdir_p(root)
+
+        for d in subdirs:
+            try:
+                self.sftp.mkdir(d)
+            except IOError:
+                continue
+            self.log_verbose(f"Created remote directory: {d}", indent=2)
+            self.dirs_created += 1
+
+    def _copy_tree(self, plan: list):
+        """
+        Copy a tree listed by _walk_local to the remote machine.
+
+        Directories are created first. Files are then uploaded by
+        SFTP_CHANNELS threads, each borrowing one of several SFTP channels on
+        the same connection, so per-file round trips overlap instead of queuing.
+        """
+        self._create_remote_dirs([remote_dir for remote_dir, _ in plan])
+
+        pairs = [pair for _, dir_pairs in plan for pair in dir_pairs]
+        if not pairs:
+            return
+
+        channels = min(SFTP_CHANNELS, len(pairs))
+        while len(self.extra_sftps) < channels - 1:
+            self.extra_sftps.append(self._open_sftp())
+        self.log_verbose(f"Uploading over {channels} SFTP channels", indent=2)
 
-        for entry in sorted(os.listdir(local_path)):
-            local_entry = os.path.join(local_path, entry)
-            remote_entry = remote_path + "/" + entry
+        pool = queue.Queue()
+        for sftp in [self.sftp] + self.extra_sftps[:channels - 1]:
+            pool.put(sftp)
 
-            if os.path.isdir(local_entry):
-                self._copy_recursive(local_entry, remote_entry)
-            else:
+        def upload(pair):
+            local_entry, remote_entry = pair
+            sftp = pool.get()
+            try:
                 self.log_verbose(f"Copying: {local_entry} -> {remote_entry}", indent=2)
-                self.sftp.put(local_entry, remote_entry)
-                self.files_copied += 1
+                # No per-file stat round trip; sizes are checked per directory afterwards
+                sftp.put(local_entry, remote_entry, confirm=False)
+            finally:
+                pool.put(sftp)
 
+            with self._count_lock:
+                self.files_copied += 1
                 if not self.verbose and self.files_copied % 50 == 0:
                     self.log("📄", f"{self.files_copied} files copied so far...", indent=2)
 
+        with ThreadPoolExecutor(max_workers=channels) as executor:
+            # Consuming the results re-raises the first upload error
+            for _ in executor.map(upload, pairs):
+                pass
+
+        self._verify_sizes(plan)
+
+    def _verify_sizes(self, plan: list):
+        """Check uploaded file sizes with one listdir per remote directory."""
+        self.log_verbose("Verifying remote file sizes...", indent=2)
+        for remote_dir, pairs in plan:
+            if not pairs:
+                continue
+            remote_sizes = {a.filename: a.st_size for a in self.sftp.listdir_attr(remote_dir)}
+            for local_entry, remote_entry in pairs:
+                local_size = os.path.getsize(local_entry)
+                remote_size = remote_sizes.get(posixpath.basename(remote_entry))
+                if remote_size != local_size:
+                    raise IOError(f"size mismatch for {remote_entry}: {remote_size} != {local_size}")
+
     def run_copy(self) -> bool:
         """Run the full copy process."""
         self.log_section(f"Copying files to {self.hostname}")
@@ -149,18 +256,22 @@ class MachineCopyFiles:
             self.log("❌", f"Local folder not found: {LOCAL_FOLDER}")
             return False
 
-        local_file_count = sum(len(files) for _, _, files in os.walk(LOCAL_FOLDER))
+        plan = self._walk_local(LOCAL_FOLDER, REMOTE_FOLDER)
+        local_file_count = sum(len(pairs) for _, pairs in plan)
         self.log("📂", f"Local folder: {LOCAL_FOLDER}")
         self.log("📊", f"Files to copy: {local_file_count}")
         self.log("📍", f"Remote destination: {REMOTE_FOLDER}")
         print()
 
+        if self.use_async:
+            return self._run_copy_async(local_file_count)
+
         if not self.connect():
             return False
 
         try:
             self.log("🚀", "Starting copy...")
-            self._copy_recursive(LOCAL_FOLDER, REMOTE_FOLDER)
+            self._copy_tree(plan)
             self.log("✅", f"Copy completed: {self.files_copied} files, {self.dirs_created} directories created")
             return True
         except Exception as e:
@@ -170,6 +281,51 @@ class MachineCopyFiles:
         finally:
             self.disconnect()
 
+    def _run_copy_async(self, local_file_count: int) -> bool:
+        """Run the copy with the asyncssh backend instead of paramiko."""
+        try:
+            asyncio.run(self._copy_async())
+        except (OSError, asyncio.TimeoutError, asyncssh.Error) as e:
+            # Before Python 3.11 a connect/login timeout is not an OSError
+            self.log("❌", f"Copy failed: {str(e) or type(e).__name__}")
+            self.log_verbose(f"Exception type: {type(e).__name__}", indent=1)
+            return False
+
+        self.files_copied = local_file_count
+        self.log("✅", f"Copy completed: {self.files_copied} files")
+        return True
+
+    async def _copy_async(self):
+        """
+        Copy LOCAL_FOLDER's contents with asyncssh.
+
+        asyncssh's recursive SFTP put walks the tree itself and keeps many
+        read/write requests in flight per file, with far less Python overhead
+        per call than paramiko.
+        """
+        self.log("🔌", f"Connecting to {self.username}@{self.hostname} (asyncssh)...")
+        async with asyncssh.connect(
+            self.hostname,
+            port=SSH_PORT,
+            username=self.username,
+            password=self.password,
+            known_hosts=None,
+            client_keys=None,
+            agent_path=None,
+            connect_timeout=30
+        ) as conn:
+            self.log("✅", f"Connected to {self.hostname}", indent=1)
+            async with conn.start_sftp_client() as sftp:
+                await sftp.makedirs(REMOTE_FOLDER, exist_ok=True)
+
+                # Copy the folder's entries into REMOTE_FOLDER, not the folder itself
+                entries = [os.path.join(LOCAL_FOLDER, name) for name in sorted(os.listdir(LOCAL_FOLDER))]
+                self.log("🚀", "Starting copy...")
+                self.log_verbose(f"asyncssh put: {len(entries)} top-level entries -> {REMOTE_FOLDER}", indent=2)
+                if entries:
+                    await sftp.put(entries, REMOTE_FOLDER, recurse=True, preserve=True, follow_symlinks=True)
+        self.log("🔌", f"Disconnected from {self.hostname}")
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -180,6 +336,7 @@ Examples:
     %(prog)s dev-server-01
     %(prog)s 192.168.1.100
     %(prog)s myhost.example.com -u admin
+    %(prog)s dev-server-01 --async
         """
     )
     parser.add_argument(
@@ -201,9 +358,19 @@ Examples:
         action='store_true',
         help='Enable verbose mode with maximum technical details'
     )
+    parser.add_argument(
+        '--async',
+        dest='use_async',
+        action='store_true',
+        help='Copy with asyncssh (pipelined SFTP) instead of paramiko'
+    )
 
     args = parser.parse_args()
 
+    if args.use_async and asyncssh is None:
+        print("❌ Error: --async requires asyncssh. Install with: pip install asyncssh")
+        sys.exit(1)
+
     print()
     print("📂" + "=" * 58)
     print("   MACHINE COPY FILES TOOL")
@@ -218,7 +385,8 @@ Examples:
         hostname=args.hostname,
         password=args.password,
         username=args.username,
-        verbose=args.verbose
+        verbose=args.verbose,
+        use_async=args.use_async
     )
 
     success = copier.run_copy()
@@ -4,13 +4,20 @@ Interactive script to generate and optionally run wbox test commands.
 
 Usage:
     python wbox_test.py
+    python wbox_test.py --test-name test_control_traffic --break-on-fail yes --run
 
 Type 'help' at any prompt to get detailed information about that parameter.
+Passing --test-name skips the prompts; the other options then come from flags.
 """
 
-import subprocess
+import argparse
+import os
+import shlex
 import sys
 
+# Directory the generated commands run in
+TESTS_DIR = "~/cheetah/src/tests"
+
 # Comprehensive help text for each parameter
 PARAMETER_HELP = {
     'cheetah_handler': """
@@ -169,10 +176,8 @@ PARAMETER_HELP = {
 
 def show_help(param_name: str) -> None:
     """Display help text for a parameter."""
-    if param_name in PARAMETER_HELP:
-        print(PARAMETER_HELP[param_name])
-    else:
-        print(f"No help available for '{param_name}'")
+    text = PARAMETER_HELP.get(param_name)
+    print(text if text is not None else f"No help available for '{param_name}'")
 
 
 def prompt_yes_no_exclude(question: str, help_key: str = None) -> str:
@@ -238,100 +243,139 @@ def build_command(
     generate_config: str,
     clear_logs: bool,
     clear_containers: bool,
-) -> str:
-    """Build the shell command based on user inputs."""
+) -> list[list[str]]:
+    """Build the commands (argv lists, run in TESTS_DIR) based on user inputs."""
     
-    parts = ["cd ~/cheetah/src/tests"]
+    commands = []
     
     # Add clear commands if requested
     if clear_containers:
-        parts.append("clear_containers")
+        commands.append(["clear_containers"])
     
     if clear_logs:
-        parts.append("clear_logs")
+        commands.append(["clear_logs"])
     
     # Build the make command
-    make_cmd = f"make test_wbox.{test_name}"
+    make_cmd = ["make", f"test_wbox.{test_name}"]
     
     # Add optional parameters
-    make_params = []
-    
     if break_on_fail == 'yes':
-        make_params.append("BP_ON_FAIL=1")
+        make_cmd.append("BP_ON_FAIL=1")
     elif break_on_fail == 'no':
-        make_params.append("BP_ON_FAIL=0")
+        make_cmd.append("BP_ON_FAIL=0")
     # 'exclude' means don't add the parameter
     
     if cheetah_handler:
-        make_params.append("CHEETAH_HANDLER=remote")
+        make_cmd.append("CHEETAH_HANDLER=remote")
     # False means don't add the parameter at all
     
     if generate_config == 'yes':
-        make_params.append("GENERATE_CONFIG=1")
+        make_cmd.append("GENERATE_CONFIG=1")
     elif generate_config == 'no':
-        make_params.append("GENERATE_CONFIG=0")
+        make_cmd.append("GENERATE_CONFIG=0")
     # 'exclude' means don't add the parameter
     
-    if make_params:
-        make_cmd += " " + " ".join(make_params)
+    commands.append(make_cmd)
     
-    parts.append(make_cmd)
-    
-    return " ; ".join(parts)
+    return commands
 
 
-def main():
-    print("=== WBox Test Command Generator ===")
-    print("(Type 'help' at any prompt for detailed information)\n")
-    
-    # 1. Cheetah handler (simple yes/no - if yes, adds CHEETAH_HANDLER=remote)
-    cheetah_handler = prompt_yes_no(
-        "Include cheetah handler (remote)?", 
-        default=False, 
-        help_key='cheetah_handler'
-    )
-    
-    # 2. Test name
-    test_name = prompt_string(
-        "Test name (e.g., test_control_traffic)",
-        help_key='test_name'
-    )
-    
-    # 3. Show or run
-    run_command = prompt_yes_no(
-        "Run the command? (no = just show)", 
-        default=False,
-        help_key='run_command'
-    )
-    
-    # 4. Break on fail
-    break_on_fail = prompt_yes_no_exclude(
-        "Break on fail?",
-        help_key='break_on_fail'
-    )
-    
-    # 5. Generate config
-    generate_config = prompt_yes_no_exclude(
-        "Generate config?",
-        help_key='generate_config'
+def format_command(commands: list[list[str]]) -> str:
+    """Render the commands as one copy-pasteable shell line."""
+    return " ; ".join([f"cd {TESTS_DIR}"] + [shlex.join(argv) for argv in commands])
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line options; without --test-name the script stays interactive."""
+    parser = argparse.ArgumentParser(
+        description='Generate and optionally run wbox test commands',
+        epilog="Without --test-name every option is asked for interactively."
     )
+    parser.add_argument('--test-name', help='Test to run: make test_wbox.<TEST_NAME>')
+    parser.add_argument('--cheetah-handler', action=argparse.BooleanOptionalAction, default=False,
+                        help='Add CHEETAH_HANDLER=remote')
+    parser.add_argument('--break-on-fail', choices=['yes', 'no', 'exclude'], default='exclude',
+                        help='Set BP_ON_FAIL=1/0, or leave it out (default: exclude)')
+    parser.add_argument('--generate-config', choices=['yes', 'no', 'exclude'], default='exclude',
+                        help='Set GENERATE_CONFIG=1/0, or leave it out (default: exclude)')
+    parser.add_argument('--clear-logs', action='store_true', help='Run clear_logs first')
+    parser.add_argument('--clear-containers', action='store_true', help='Run clear_containers first')
+    parser.add_argument('--run', action='store_true', help='Run the command instead of just showing it')
+    for name in PARAMETER_HELP:
+        parser.add_argument(f"--help-{name.replace('_', '-')}", action='store_true',
+                            help=f"Show detailed help for {name} and exit")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
     
-    # 6. Clear logs
-    clear_logs = prompt_yes_no(
-        "Clear logs?", 
-        default=False,
-        help_key='clear_logs'
-    )
+    for name in PARAMETER_HELP:
+        if getattr(args, f"help_{name}"):
+            show_help(name)
+            sys.exit(0)
     
-    # 7. Clear containers
-    clear_containers = prompt_yes_no(
-        "Clear containers?", 
-        default=False,
-        help_key='clear_containers'
-    )
+    if args.test_name is not None:
+        # Non-interactive: everything comes from the flags
+        cheetah_handler = args.cheetah_handler
+        test_name = args.test_name
+        run_command = args.run
+        break_on_fail = args.break_on_fail
+        generate_config = args.generate_config
+        clear_logs = args.clear_logs
+        clear_containers = args.clear_containers
+    else:
+        print("=== WBox Test Command Generator ===")
+        print("(Type 'help' at any prompt for detailed information)\n")
+        
+        # 1. Cheetah handler (simple yes/no - if yes, adds CHEETAH_HANDLER=remote)
+        cheetah_handler = prompt_yes_no(
+            "Include cheetah handler (remote)?", 
+            default=False, 
+            help_key='cheetah_handler'
+        )
+        
+        # 2. Test name
+        test_name = prompt_string(
+            "Test name (e.g., test_control_traffic)",
+            help_key='test_name'
+        )
+        
+        # 3. Show or run
+        run_command = prompt_yes_no(
+            "Run the command? (no = just show)", 
+            default=False,
+            help_key='run_command'
+        )
+        
+        # 4. Break on fail
+        break_on_fail = prompt_yes_no_exclude(
+            "Break on fail?",
+            help_key='break_on_fail'
+        )
+        
+        # 5. Generate config
+        generate_config = prompt_yes_no_exclude(
+            "Generate config?",
+            help_key='generate_config'
+        )
+        
+        # 6. Clear logs
+        clear_logs = prompt_yes_no(
+            "Clear logs?", 
+            default=False,
+            help_key='clear_logs'
+        )
+        
+        # 7. Clear containers
+        clear_containers = prompt_yes_no(
+            "Clear containers?", 
+            default=False,
+            help_key='clear_containers'
+        )
     
-    # Build the command
-    command = build_command(
+    # Build the commands
+    commands = build_command(
         test_name=test_name,
         cheetah_handler=cheetah_handler,
         break_on_fail=break_on_fail,
@@ -343,14 +387,43 @@ def main():
     print("\n" + "=" * 60)
     print("Generated command:")
     print("=" * 60)
-    print(command)
+    print(format_command(commands))
     print("=" * 60 + "\n")
     
     if run_command:
-        print("Running command...\n")
-        # Use bash -c to run the compound command
-        result = subprocess.run(['bash', '-c', command], text=True)
-        sys.exit(result.returncode)
+        print("Running command...\n", flush=True)
+        tests_dir = os.path.expanduser(TESTS_DIR)
+        *pre_steps, make_cmd = commands
+        
+        # Run each step directly (no bash -c); like the ';' chain, a failed
+        # step doesn't stop the next one and the exit code is make's
+        if pre_steps:
+            # Imported here: subprocess (with selectors, signal, ...) is most of
+            # this script's startup time and the default show-only path never needs it
+            import subprocess
+            
+            for argv in pre_steps:
+                try:
+                    subprocess.run(argv, cwd=tests_dir)
+                except OSError as e:
+                    print(f"{argv[0]}: {e.strerror}", file=sys.stderr)
+        
+        if os.name == 'posix':
+            # Become make: no Python process idling for the whole test run,
+            # and Ctrl-C / the exit code reach the caller directly
+            try:
+                os.chdir(tests_dir)
+                os.execvp(make_cmd[0], make_cmd)
+            except OSError as e:
+                print(f"{e.filename or make_cmd[0]}: {e.strerror}", file=sys.stderr)
+                sys.exit(127)
+        
+        import subprocess
+        try:
+            sys.exit(subprocess.run(make_cmd, cwd=tests_dir).returncode)
+        except OSError as e:
+            print(f"{make_cmd[0]}: {e.strerror}", file=sys.stderr)
+            sys.exit(127)
     else:
         print("Command not executed. Copy and paste to run manually.")
 